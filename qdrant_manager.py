@@ -3,9 +3,16 @@ Qdrant Vector Database Manager for EchoMind
 Handles storage and retrieval of phrase patterns for personalization
 """
 
+import atexit
+import json
+import logging
 import os
+import threading
+from collections import Counter, OrderedDict, defaultdict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
 from datetime import datetime
-from typing import Dict, List, Optional
+from functools import lru_cache
+from typing import DefaultDict, Deque, Dict, List, Optional, Set, Tuple
 from pathlib import Path
 
 import google.generativeai as genai
@@ -25,56 +32,291 @@ QDRANT_COLLECTION = "echomind_phrases"
 EMBEDDING_MODEL = "models/embedding-001"
 EMBEDDING_DIM = 768  # Gemini embedding dimension
 
-# Initialize Qdrant client in local mode (no server needed)
-client = QdrantClient(path=str(QDRANT_PATH))
+logger = logging.getLogger("echomind")
 
-# Counter for unique point IDs
-_point_counter = {}
 
+@lru_cache(maxsize=None)
+def get_client() -> QdrantClient:
+    """Qdrant client in local mode (no server needed), created once per process"""
+    return QdrantClient(path=str(QDRANT_PATH))
 
-def _get_next_point_id(child_id: str) -> int:
-    """Get next unique point ID for a child"""
-    if child_id not in _point_counter:
-        _point_counter[child_id] = 0
-    _point_counter[child_id] += 1
-    return _point_counter[child_id]
 
+_collection_ready = False
+_collection_lock = threading.Lock()
 
-def init_qdrant() -> None:
-    """Initialize Qdrant collection if it doesn't exist"""
+# Background worker for writes that shouldn't block the UI. A single thread keeps
+# writes ordered and avoids racing on the point ID counter.
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="qdrant-write")
+atexit.register(_executor.shutdown, wait=False)
+
+# Embeddings by context string, shared by the store and query paths
+EMBEDDING_CACHE_SIZE = 1024
+_embedding_cache: "OrderedDict[str, Tuple[float, ...]]" = OrderedDict()
+_embedding_cache_lock = threading.Lock()
+
+# Phrase selections waiting to be embedded and upserted as one batch
+FLUSH_BATCH_SIZE = 8
+FLUSH_INTERVAL_S = 5.0
+_pending: List[Tuple[Dict, str]] = []  # (payload, context string)
+_pending_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_flush_timer: Optional[threading.Timer] = None
+
+# Phrase usage per (child_id, category), kept in sync with the stored points
+_phrase_counts: DefaultDict[Tuple[str, str], Counter] = defaultdict(Counter)
+# Children with at least one stored point; anyone else has nothing to search
+_known_children: Set[str] = set()
+_phrase_counts_lock = threading.Lock()
+
+# Phrase selections whose embedding failed, kept out of the vector index.
+# The most recent ones per child are also held in memory for similarity fallback.
+FALLBACK_PATH = QDRANT_PATH / "fallback.jsonl"
+FALLBACK_RECORDS_PER_CHILD = 256
+_fallback_records: DefaultDict[str, Deque[Dict]] = defaultdict(
+    lambda: deque(maxlen=FALLBACK_RECORDS_PER_CHILD)
+)
+
+# Monotonic point ID counter, persisted so IDs stay unique across restarts.
+# Starts above 2**31 so it never collides with the older hash-based IDs.
+_NEXT_ID_PATH = QDRANT_PATH / "next_id"
+_LEGACY_ID_LIMIT = 2**31
+
+
+def _load_next_id() -> int:
     try:
-        # Check if collection exists
-        collections = client.get_collections().collections
-        collection_names = [col.name for col in collections]
+        return max(int(_NEXT_ID_PATH.read_text().strip()), _LEGACY_ID_LIMIT)
+    except (OSError, ValueError):
+        return _LEGACY_ID_LIMIT
 
-        if QDRANT_COLLECTION not in collection_names:
-            # Create collection
-            client.create_collection(
-                collection_name=QDRANT_COLLECTION,
-                vectors_config=VectorParams(
-                    size=EMBEDDING_DIM,
-                    distance=Distance.COSINE,
-                ),
-            )
-            print(f"✓ Qdrant collection '{QDRANT_COLLECTION}' created")
-        else:
-            print(f"✓ Qdrant collection '{QDRANT_COLLECTION}' already exists")
-    except Exception as e:
-        print(f"Error initializing Qdrant: {e}")
-        raise
+
+_next_id = _load_next_id()
+
+
+def _get_next_point_id() -> int:
+    """Get next unique point ID (callers hold _flush_lock)"""
+    global _next_id
+    _next_id += 1
+    return _next_id
+
+
+def _save_next_id() -> None:
+    """Persist the counter atomically so a crash never leaves a truncated file"""
+    QDRANT_PATH.mkdir(parents=True, exist_ok=True)
+    tmp_path = _NEXT_ID_PATH.with_suffix(".tmp")
+    tmp_path.write_text(str(_next_id))
+    os.replace(tmp_path, _NEXT_ID_PATH)
+
+
+def ensure_collection() -> None:
+    """Create the Qdrant collection if it doesn't exist; only checks once per process"""
+    global _collection_ready
+    if _collection_ready:
+        return
+    with _collection_lock:
+        if _collection_ready:
+            return
+        try:
+            client = get_client()
+            # Check if collection exists
+            collections = client.get_collections().collections
+            collection_names = [col.name for col in collections]
+
+            if QDRANT_COLLECTION not in collection_names:
+                # Create collection
+                client.create_collection(
+                    collection_name=QDRANT_COLLECTION,
+                    vectors_config=VectorParams(
+                        size=EMBEDDING_DIM,
+                        distance=Distance.COSINE,
+                    ),
+                )
+                logger.info("Qdrant collection '%s' created", QDRANT_COLLECTION)
+            else:
+                logger.info("Qdrant collection '%s' already exists", QDRANT_COLLECTION)
+                _load_phrase_counts()
+            _collection_ready = True
+        except Exception as e:
+            logger.error("Error initializing Qdrant: %s", e)
+            raise
+
+
+@lru_cache(maxsize=256)
+def _context_key(category: str, time_of_day: str, day_of_week: str, location: str) -> str:
+    return f"Category: {category}. Time of day: {time_of_day}. Day: {day_of_week}. Location: {location}"
+
+
+def _build_context_str(category: str, context: Dict[str, str]) -> str:
+    """Context string that is embedded for storage and similarity search"""
+    return _context_key(
+        category,
+        context.get("time_of_day", "unknown"),
+        context.get("day_of_week", "unknown"),
+        context.get("location", "unknown"),
+    )
+
+
+def _get_cached_embedding(text: str) -> Optional[Tuple[float, ...]]:
+    """Cached embedding for a text, marked as most recently used"""
+    with _embedding_cache_lock:
+        embedding = _embedding_cache.get(text)
+        if embedding is not None:
+            _embedding_cache.move_to_end(text)
+        return embedding
+
+
+def _cache_embedding(text: str, embedding: List[float]) -> None:
+    """Remember an embedding, evicting the least recently used beyond the cache size"""
+    with _embedding_cache_lock:
+        _embedding_cache[text] = tuple(embedding)
+        _embedding_cache.move_to_end(text)
+        while len(_embedding_cache) > EMBEDDING_CACHE_SIZE:
+            _embedding_cache.popitem(last=False)
 
 
 def generate_embedding(text: str) -> Optional[List[float]]:
     """Generate embedding for a text using Gemini"""
+    cached = _get_cached_embedding(text)
+    if cached is not None:
+        return list(cached)
     try:
         response = genai.embed_content(
             model=EMBEDDING_MODEL,
             content=text,
         )
-        return response["embedding"]
+        embedding = response["embedding"]
     except Exception as e:
-        print(f"Error generating embedding: {e}")
+        logger.error("Error generating embedding: %s", e)
         return None
+    _cache_embedding(text, embedding)
+    return list(embedding)
+
+
+def generate_embeddings(texts: List[str]) -> List[Optional[List[float]]]:
+    """Generate embeddings for several texts, batch-embedding only the cache misses"""
+    embeddings: List[Optional[List[float]]] = []
+    misses = []
+    for text in texts:
+        cached = _get_cached_embedding(text)
+        embeddings.append(list(cached) if cached is not None else None)
+        if cached is None:
+            misses.append(text)
+    if not misses:
+        return embeddings
+    try:
+        response = genai.embed_content(
+            model=EMBEDDING_MODEL,
+            content=misses,
+        )
+    except Exception as e:
+        logger.error("Error generating embeddings: %s", e)
+        return embeddings
+    fetched = dict(zip(misses, response["embedding"]))
+    for text, embedding in fetched.items():
+        _cache_embedding(text, embedding)
+    return [
+        embedding if embedding is not None else fetched.get(text)
+        for text, embedding in zip(texts, embeddings)
+    ]
+
+
+def _schedule_flush() -> None:
+    """Start the flush timer unless one is already running (callers hold _pending_lock)"""
+    global _flush_timer
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(FLUSH_INTERVAL_S, flush_pending_phrases)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def flush_pending_phrases() -> int:
+    """Embed and upsert all buffered phrase selections in one batch. Returns the number stored."""
+    global _flush_timer
+    with _flush_lock:
+        with _pending_lock:
+            batch = list(_pending)
+            _pending.clear()
+            if _flush_timer is not None:
+                _flush_timer.cancel()
+                _flush_timer = None
+        if not batch:
+            return 0
+
+        stored: List[Dict] = []
+        fallback_count = 0
+        try:
+            # One embedding per distinct context string
+            unique_texts = list(dict.fromkeys(context_str for _, context_str in batch))
+            embeddings = dict(zip(unique_texts, generate_embeddings(unique_texts)))
+
+            # One timestamp per batch; selections in a batch are at most FLUSH_INTERVAL_S apart
+            timestamp = datetime.now().isoformat()
+            points = []
+            unembedded = []
+            for payload, context_str in batch:
+                payload["timestamp"] = timestamp
+                embedding = embeddings.get(context_str)
+                if not embedding:
+                    # Graceful degradation - log the phrase outside the vector index
+                    # so it still counts, without a dummy vector skewing searches
+                    unembedded.append(payload)
+                    continue
+
+                # Create point with unique ID
+                points.append(
+                    PointStruct(
+                        id=_get_next_point_id(),
+                        vector=embedding,
+                        payload=payload,
+                    )
+                )
+
+            if points:
+                try:
+                    # Persist the counter before writing so IDs are never reused after a crash
+                    _save_next_id()
+
+                    # Upsert the whole batch into Qdrant
+                    get_client().upsert(
+                        collection_name=QDRANT_COLLECTION,
+                        points=points,
+                    )
+                    stored.extend(point.payload for point in points)
+                except Exception as e:
+                    logger.error("Error upserting phrases, logging them without embedding: %s", e)
+                    unembedded.extend(point.payload for point in points)
+            if unembedded:
+                _append_fallback(unembedded)
+                with _phrase_counts_lock:
+                    for payload in unembedded:
+                        _fallback_records[payload["child_id"]].append(payload)
+                stored.extend(unembedded)
+                fallback_count = len(unembedded)
+        except Exception as e:
+            logger.error("Error storing phrases, requeueing them: %s", e)
+
+        # Put back anything that wasn't written so the next flush retries it
+        stored_ids = {id(payload) for payload in stored}
+        failed = [item for item in batch if id(item[0]) not in stored_ids]
+        if failed:
+            with _pending_lock:
+                _pending[:0] = failed
+                _schedule_flush()
+
+        with _phrase_counts_lock:
+            for payload in stored:
+                _phrase_counts[(payload["child_id"], payload["category"])][payload["phrase"]] += 1
+                _known_children.add(payload["child_id"])
+
+        if stored:
+            logger.info(
+                "Stored %d phrase(s), %d without embedding",
+                len(stored) - fallback_count, fallback_count,
+            )
+        return len(stored)
+
+
+# Don't lose buffered selections when the server stops
+atexit.register(flush_pending_phrases)
 
 
 def store_phrase(
@@ -83,56 +325,106 @@ def store_phrase(
     phrase: str,
     context: Dict[str, str],
 ) -> bool:
-    """Store a phrase selection with context in Qdrant for personalization"""
+    """
+    Queue a phrase selection with context for storage in Qdrant.
+    Selections are written in batches once FLUSH_BATCH_SIZE are pending or
+    FLUSH_INTERVAL_S has passed, whichever comes first.
+    """
     try:
         # Build context string for embedding
-        context_str = (
-            f"Category: {category}. "
-            f"Time of day: {context.get('time_of_day', 'unknown')}. "
-            f"Day: {context.get('day_of_week', 'unknown')}. "
-            f"Location: {context.get('location', 'unknown')}"
-        )
-
-        # Generate embedding of the context (skip if quota exceeded)
-        embedding = generate_embedding(context_str)
-        if not embedding:
-            # Graceful degradation - store without embedding
-            # Will still log the phrase for future use, just won't do similarity search
-            embedding = [0.0] * EMBEDDING_DIM  # Dummy vector
+        context_str = _build_context_str(category, context)
 
         # Prepare payload (metadata)
         payload = {
             "child_id": child_id,
             "category": category,
             "phrase": phrase,
-            "timestamp": datetime.now().isoformat(),
             "time_of_day": context.get("time_of_day", "unknown"),
             "day_of_week": context.get("day_of_week", "unknown"),
             "location": context.get("location", "unknown"),
             "context_str": context_str,
         }
 
-        # Create point with unique ID
-        point_id = _get_next_point_id(child_id)
-        point = PointStruct(
-            id=hash((child_id, point_id)) % (2**31),  # Convert to positive int
-            vector=embedding,
-            payload=payload,
-        )
+        with _pending_lock:
+            _pending.append((payload, context_str))
+            flush_now = len(_pending) >= FLUSH_BATCH_SIZE
+            if not flush_now:
+                _schedule_flush()
 
-        # Upsert point into Qdrant
-        client.upsert(
-            collection_name=QDRANT_COLLECTION,
-            points=[point],
-        )
-
-        print(f"✓ Stored phrase: '{phrase}' (Category: {category})")
+        if flush_now:
+            flush_pending_phrases()
         return True
     except Exception as e:
-        print(f"Error storing phrase: {e}")
+        logger.error("Error storing phrase: %s", e)
         return False
 
 
+def store_phrase_async(
+    child_id: str,
+    category: str,
+    phrase: str,
+    context: Dict[str, str],
+) -> Future:
+    """Store a phrase selection in the background; the future resolves to store_phrase's result"""
+    return _executor.submit(store_phrase, child_id, category, phrase, dict(context))
+
+
+def _format_similar(hits) -> List[Dict]:
+    """Format scored points as similar-context records"""
+    similar = []
+    for hit in hits:
+        similar.append({
+            "phrase": hit.payload.get("phrase"),
+            "category": hit.payload.get("category"),
+            "time_of_day": hit.payload.get("time_of_day"),
+            "similarity_score": hit.score,
+        })
+    return similar
+
+
+def _append_fallback(payloads: List[Dict]) -> None:
+    """Log phrase selections that couldn't be embedded as JSON lines"""
+    QDRANT_PATH.mkdir(parents=True, exist_ok=True)
+    with FALLBACK_PATH.open("a", encoding="utf-8") as fh:
+        for payload in payloads:
+            fh.write(json.dumps(payload, ensure_ascii=False) + "\n")
+
+
+def _read_fallback() -> List[Dict]:
+    """Read every logged phrase selection that has no embedding"""
+    try:
+        with FALLBACK_PATH.open(encoding="utf-8") as fh:
+            lines = fh.readlines()
+    except OSError:
+        return []
+    records = []
+    for line in lines:
+        try:
+            records.append(json.loads(line))
+        except ValueError:
+            continue  # skip a partially written line
+    return records
+
+
+def _similar_from_fallback(child_id: str, category: str, context_str: str, limit: int) -> List[Dict]:
+    """Most recent unembedded selections for the same context, then the same category"""
+    with _phrase_counts_lock:
+        records = list(_fallback_records.get(child_id, ()))
+    exact = [r for r in records if r.get("context_str") == context_str]
+    same_category = [
+        r for r in records if r.get("category") == category and r.get("context_str") != context_str
+    ]
+    similar = []
+    for record in (exact[::-1] + same_category[::-1])[:limit]:
+        similar.append({
+            "phrase": record.get("phrase"),
+            "category": record.get("category"),
+            "time_of_day": record.get("time_of_day"),
+            "similarity_score": None,
+        })
+    return similar
+
+
 def get_similar_contexts(
     child_id: str,
     category: str,
@@ -144,20 +436,19 @@ def get_similar_contexts(
     Returns the most similar phrase selections to help inform AI suggestions.
     Gracefully handles embedding quota errors.
     """
+    # Nothing stored for this child yet, so skip the embedding call entirely
+    if child_id not in _known_children:
+        return []
+
     try:
         # Build context string (same as in store_phrase)
-        context_str = (
-            f"Category: {category}. "
-            f"Time of day: {context.get('time_of_day', 'unknown')}. "
-            f"Day: {context.get('day_of_week', 'unknown')}. "
-            f"Location: {context.get('location', 'unknown')}"
-        )
+        context_str = _build_context_str(category, context)
 
         # Generate embedding of current context
         embedding = generate_embedding(context_str)
         if not embedding:
-            # Embedding quota exceeded - just return empty, don't fail
-            return []
+            # Embedding quota exceeded - fall back to exact context matches, don't fail
+            return _similar_from_fallback(child_id, category, context_str, limit)
 
         # Try to search - handle both client APIs
         try:
@@ -170,7 +461,7 @@ def get_similar_contexts(
                 ]
             )
 
-            search_result = client.search(
+            search_result = get_client().search(
                 collection_name=QDRANT_COLLECTION,
                 query_vector=embedding,
                 query_filter=search_filter,
@@ -178,16 +469,7 @@ def get_similar_contexts(
                 with_payload=True,
             )
 
-            # Format results
-            similar = []
-            for hit in search_result:
-                similar.append({
-                    "phrase": hit.payload.get("phrase"),
-                    "category": hit.payload.get("category"),
-                    "time_of_day": hit.payload.get("time_of_day"),
-                    "similarity_score": hit.score,
-                })
-            return similar
+            return _format_similar(search_result)
         except AttributeError:
             # search() method not available in this Qdrant version, return empty
             return []
@@ -198,48 +480,53 @@ def get_similar_contexts(
 
 def get_top_phrases_in_category(child_id: str, category: str, limit: int = 5) -> List[str]:
     """Get the most frequently used phrases in a specific category for a child"""
-    try:
-        # Query all points for this child and category
-        search_filter = Filter(
-            must=[
-                FieldCondition(
-                    key="child_id",
-                    match=MatchValue(value=child_id),
-                ),
-                FieldCondition(
-                    key="category",
-                    match=MatchValue(value=category),
-                ),
-            ]
-        )
-
-        # Try to get all points (not a real search, just filter)
-        try:
-            zero_vector = [0.0] * EMBEDDING_DIM
-            search_result = client.search(
-                collection_name=QDRANT_COLLECTION,
-                query_vector=zero_vector,
-                query_filter=search_filter,
-                limit=limit * 5,  # Get more to deduplicate
-                with_payload=True,
-            )
+    with _phrase_counts_lock:
+        counts = _phrase_counts.get((child_id, category))
+        if not counts:
+            return []
+        return [phrase for phrase, _count in counts.most_common(limit)]
 
-            # Count occurrences and get top phrases
-            phrase_counts = {}
-            for hit in search_result:
-                phrase = hit.payload.get("phrase", "")
-                if phrase:
-                    phrase_counts[phrase] = phrase_counts.get(phrase, 0) + 1
 
-            # Sort by frequency and return top phrases
-            top_phrases = sorted(phrase_counts.items(), key=lambda x: x[1], reverse=True)
-            return [phrase for phrase, count in top_phrases[:limit]]
-        except AttributeError:
-            # search() method not available, graceful degradation
-            return []
-    except Exception as e:
-        # Silently fail - don't break the app
-        return []
+def _load_phrase_counts() -> None:
+    """Rebuild the in-memory phrase counts and known children from every stored point"""
+    counts: DefaultDict[Tuple[str, str], Counter] = defaultdict(Counter)
+    children = set()
+    offset = None
+    while True:
+        points, offset = get_client().scroll(
+            collection_name=QDRANT_COLLECTION,
+            limit=256,
+            offset=offset,
+            with_payload=["child_id", "category", "phrase"],
+            with_vectors=False,
+        )
+        for point in points:
+            payload = point.payload or {}
+            if payload.get("child_id"):
+                children.add(payload["child_id"])
+            if payload.get("phrase"):
+                counts[(payload.get("child_id"), payload.get("category"))][payload["phrase"]] += 1
+        if offset is None:
+            break
+
+    # Selections logged without an embedding count too
+    fallback_records: DefaultDict[str, Deque[Dict]] = defaultdict(
+        lambda: deque(maxlen=FALLBACK_RECORDS_PER_CHILD)
+    )
+    for payload in _read_fallback():
+        if payload.get("child_id"):
+            children.add(payload["child_id"])
+            fallback_records[payload["child_id"]].append(payload)
+        if payload.get("phrase"):
+            counts[(payload.get("child_id"), payload.get("category"))][payload["phrase"]] += 1
+
+    with _phrase_counts_lock:
+        _phrase_counts.clear()
+        _phrase_counts.update(counts)
+        _known_children.clear()
+        _known_children.update(children)
+        _fallback_records.clear()
+        _fallback_records.update(fallback_records)
 
 
 def get_personalization_context(
@@ -255,7 +542,7 @@ def get_personalization_context(
         # Get similar contexts
         similar = get_similar_contexts(child_id, category, context, limit=3)
 
-        # Get top phrases in category
+        # Get top phrases in category (served from the in-memory counts)
         top_phrases = get_top_phrases_in_category(child_id, category, limit=3)
 
         # Build personalization string
@@ -274,5 +561,5 @@ def get_personalization_context(
 
         return personalization
     except Exception as e:
-        print(f"Error building personalization context: {e}")
+        logger.error("Error building personalization context: %s", e)
         return ""